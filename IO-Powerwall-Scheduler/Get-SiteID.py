@@ -1,55 +1,111 @@
 #!/usr/bin/env python
-import requests,json
-import hashlib
-import datetime
-from datetime import date, datetime,timezone,timedelta
+# Finds the Tesla site ID(s) for a Tessie API key.
+#
+#   python Get-SiteID.py
+#       Prints the Powerwall site ID for the Tessie key in config.txt
+#   python Get-SiteID.py --discover KEYS_FILE [--output-dir DIR]
+#       Onboarding for fleets. KEYS_FILE holds one Tessie API key per line. Every key is queried concurrently, and for
+#       every Powerwall found config-<site id>.txt is created (from the default config) or updated with the key and site ID
+import json
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from requests.models import HTTPError
-from zoneinfo import ZoneInfo
 
-import check_free_electricity
+import fn_config
+import fn_http
+import fn_resilience
 
 DEBUG = False
 CONFIG_FILE = "config.txt"
+DISCOVERY_WORKERS = 16 # Maximum number of Tessie keys queried at once
 tessieapikey="XXXXXXXXXXXXXXXXXXXXXXXXXXX"
 
-try:
-   f = open(CONFIG_FILE,"r")
-except:
-   print("Config file ("+CONFIG_FILE+") does not exist. Please execute IO-Update-Powerwall-Schedule first to create a blank config file\nThen add the Tessia API Key and rerun this script\n")
-   quit()
-
-for line in f:
-  if(line!="\n" and line.strip()!="" and line.strip()[0]!="#"):
-    linesplit = line.strip().split(" ")
-    if(linesplit[0] == "TESSIE_API_KEY"):
-      tessieapikey = linesplit[1]
-
-if(tessieapikey=="XXXXXXXXXXXXXXXXXXXXXXXXXXX"):
-  print("It looks like you've not edited your Tessie API key in the config file. Please do that and rerun the script.\nQuitting...")
-  quit()
-
 # Tesla URL to get the Site ID
 teslaurl = "https://api.tessie.com/api/1/products"
 
-def getStatus(tessieapikey, teslaurl):
-    try:
-        url=teslaurl
-        headers={"Content-Type": "application/json","Authorization": "Bearer "+tessieapikey}
-        if DEBUG:
-           print("Get Status Headers: "+str(headers))
-           print("Get Status URL: "+url)
-        r = requests.get(url,headers=headers)
-        if DEBUG:
-          print(f'Get Status HTTP Error {r.status_code}') 
-          print(f'Get status HTTP Message {r.reason}')
+def getEnergySites(tessieapikey, teslaurl):
+    # Pick Powerwalls by product type rather than position - vehicles and solar-only sites can come in any order
+    headers={"Content-Type": "application/json","Authorization": "Bearer "+tessieapikey}
+    if DEBUG:
+       print("Get Status URL: "+teslaurl)
+    def get():
+        r = fn_resilience.checkResponse(fn_http.getSession().get(teslaurl,headers=headers,timeout=30))
         if DEBUG:
+           print(f'Get Status HTTP Error {r.status_code}')
+           print(f'Get status HTTP Message {r.reason}')
            print("Get Status Result: \n"+r.text)
            print("\n-------------------------------------------------------------------\n")
-        print("Tesla Site ID - add this to your config.txt: "+str(json.loads(r.text)["response"][1]["energy_site_id"]))
+        r.raise_for_status()
+        return json.loads(r.text)["response"]
+    products = fn_resilience.call({}, "tessie-products", get)
+    return [product for product in products if "energy_site_id" in product and product.get("resource_type","battery") == "battery"]
+
+def getStatus(tessieapikey, teslaurl):
+    try:
+        sites = getEnergySites(tessieapikey, teslaurl)
+        if not sites:
+           print("No Powerwall found for this Tessie API key")
+        for site in sites:
+           print("Tesla Site ID - add this to your config.txt: "+str(site["energy_site_id"])+" ("+str(site.get("site_name",""))+")")
 
     except HTTPError as http_err:
         print(f'Status: HTTP Error {http_err}')
     except Exception as err:
         print(f'Status: Another error occurred: {err}')
 
+def discover(keysFile, outputDir):
+    with open(keysFile,"r") as f:
+       keys = [line.strip() for line in f if line.strip()!="" and line.strip()[0]!="#"]
+    def lookup(key):
+        try:
+           return getEnergySites(key, teslaurl)
+        except Exception as err:
+           return err
+    os.makedirs(outputDir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1,min(DISCOVERY_WORKERS,len(keys)))) as pool:
+       results = list(pool.map(lookup, keys))
+
+    for key, sites in zip(keys, results):
+       # Never print a whole key
+       keyName = key[:6]+"..."
+       if isinstance(sites, Exception):
+          print(f'Tessie key {keyName}: error {sites}')
+          continue
+       if not sites:
+          print(f'Tessie key {keyName}: no Powerwall found')
+       for site in sites:
+          siteId = str(site["energy_site_id"])
+          configFile = os.path.join(outputDir, "config-"+siteId+".txt")
+          try:
+             created = fn_config.updateConfigFile(configFile, {"TESSIE_API_KEY": key, "TESLA_SITE_ID": siteId})
+          except OSError as err:
+             print(f'Tessie key {keyName}: could not write {configFile} for site {siteId}: {err}')
+             continue
+          print(f'Tessie key {keyName}: {"created" if created else "updated"} {configFile} for site {siteId} ({site.get("site_name","")})')
+    print("\nAdd the Octopus API key and account number to any newly created config files before use")
+
+parser = argparse.ArgumentParser(description="Find the Tesla site ID for one or many Tessie API keys")
+parser.add_argument("--discover", metavar="KEYS_FILE", help="File of Tessie API keys, one per line - writes a config file per Powerwall found")
+parser.add_argument("--output-dir", default=".", help="Where --discover writes the config files")
+args = parser.parse_args()
+
+if args.discover:
+  discover(args.discover, args.output_dir)
+  quit()
+
+try:
+   # Only the Tessie key is needed at this point - the site ID is what we're about to find
+   tessieapikey = fn_config.loadConfig(CONFIG_FILE, requiredKeys=("TESSIE_API_KEY",))["TESSIE_API_KEY"]
+except FileNotFoundError:
+   print("Config file ("+CONFIG_FILE+") does not exist. Please execute IO-Update-Powerwall-Schedule first to create a blank config file\nThen add the Tessia API Key and rerun this script\n")
+   quit()
+except fn_config.ConfigError as err:
+   print(f"Invalid config file: {err}")
+   quit()
+
+if(tessieapikey=="XXXXXXXXXXXXXXXXXXXXXXXXXXX"):
+  print("It looks like you've not edited your Tessie API key in the config file. Please do that and rerun the script.\nQuitting...")
+  quit()
+
 getStatus(tessieapikey,teslaurl)
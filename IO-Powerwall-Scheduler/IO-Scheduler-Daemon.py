@@ -0,0 +1,95 @@
+#-----------------------------------------------------------------------------------------------------------------------------#
+#--                                                                                                                         --#
+#--                                    Intelligent Octopus Powerwall Scheduler - Daemon                                     --#
+#--                                                                                                                         --#
+#--  Long-running alternative to scheduling IO-Update-Powerwall-Schedule with cron. Runs the scheduler for one or more      --#
+#--  config files (fleet mode) in a single process. Sites in a fleet are run concurrently, each on its own schedule:        --#
+#--  polling fast when the Octopus dispatches have just changed or a boundary (23:30, 05:30, midnight, dispatch, free       --#
+#--  and savings session edges) is close, and backing off while the dispatches stay the same. --interval forces a fixed     --#
+#--  interval instead.                                                                                                      --#
+#--                                                                                                                         --#
+#--  Usage: python IO-Scheduler-Daemon.py [--interval 60] [--log LOG_FILE] [--status-port PORT]                             --#
+#--                                         config1.txt [config2.txt ...]                                                   --#
+#--                                                                                                                         --#
+#-----------------------------------------------------------------------------------------------------------------------------#
+
+#!/usr/bin/env python
+import argparse
+import os
+import builtins
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import fn_logging
+import fn_status_api
+import fn_adaptive_poll
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IO-Update-Powerwall-Schedule-v0.6.py")
+LOG_FILE = "IO-Update-Powerwall-Schedule.log"
+
+# Compiled once. Each run executes it in a fresh namespace of its own - unlike runpy, this never touches sys.modules
+# or sys.argv, so several sites can run at the same time safely
+with open(SCRIPT, "r") as f:
+    SCRIPT_CODE = compile(f.read(), SCRIPT, "exec")
+
+
+def runSite(configFile, logFile):
+    """Run the scheduler once for a config file and return the site ID, or None if the run did not get that far."""
+    siteGlobals = {"__name__": "io_scheduler_run", "__file__": SCRIPT, "__builtins__": builtins,
+                   "SCHEDULER_ARGV": [configFile, logFile], "DAEMON_MODE": True}
+    try:
+        exec(SCRIPT_CODE, siteGlobals)
+    except SystemExit:
+        # The scheduler quits when MQTT disables the automation or the config file has just been created
+        pass
+    except Exception as err:
+        print(f'Scheduler run for {configFile} failed: {err}')
+    return siteGlobals.get("teslasiteid")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Intelligent Octopus Powerwall Scheduler continuously")
+    parser.add_argument("configs", nargs="+", help="One config file per Powerwall site")
+    parser.add_argument("--interval", type=int, help="Run every this many seconds instead of adapting to the dispatches")
+    parser.add_argument("--log", default=LOG_FILE, help="Log file shared by all sites")
+    parser.add_argument("--status-port", type=int, help="Serve the latest schedules over HTTP on this port")
+    parser.add_argument("--status-host", default="127.0.0.1", help="Address for the status API to listen on")
+    args = parser.parse_args()
+
+    if args.status_port:
+        fn_status_api.start(args.status_port, args.status_host)
+
+    # When each config file is next due to run, and the runs in progress. Every site is rescheduled as soon as its
+    # own run finishes, so a site stuck in retries never holds up the others
+    nextRun = {configFile: time.monotonic() for configFile in args.configs}
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(args.configs)) as pool:
+        while True:
+            for configFile, runAt in nextRun.items():
+                if configFile not in running and runAt <= time.monotonic():
+                    running[configFile] = pool.submit(runSite, configFile, args.log)
+
+            idle = [runAt for configFile, runAt in nextRun.items() if configFile not in running]
+            timeout = max(0, min(idle) - time.monotonic()) if idle else None
+            if running:
+                wait(running.values(), timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(timeout)
+
+            for configFile, future in list(running.items()):
+                if not future.done():
+                    continue
+                siteId = future.result()
+                del running[configFile]
+                if args.interval:
+                    delay = args.interval
+                elif siteId:
+                    delay = fn_adaptive_poll.nextDelay(siteId)
+                else:
+                    delay = fn_adaptive_poll.FAST_INTERVAL
+                nextRun[configFile] = time.monotonic() + delay
+                fn_logging.flush()
+
+
+if __name__ == "__main__":
+    main()
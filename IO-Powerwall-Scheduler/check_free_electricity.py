@@ -6,7 +6,7 @@ import dateparser
 import pytz
 
 def freeElectric():
-    resp = urllib.request.urlopen("https://octopus.energy/free-electricity/")
+    resp = urllib.request.urlopen("https://octopus.energy/free-electricity/", timeout=30)
     body = resp.read().decode("utf-8")
     if m := re.search(r"⚡️\s*\b.+(\w+ \d+\w* \w+) (\d+)([ap]m)?-(\d+)([ap]m)\b\s*⚡️", body):
         if m.group(3):
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# All delays in seconds
+FAST_INTERVAL = 30 # Used just after the dispatches change and when a boundary is close
+STABLE_INTERVAL = 120 # Starting point once the dispatches have settled - doubles for each further unchanged run
+STABLE_MAX_INTERVAL = 300 # Cap while there are dispatches planned - slots can still move
+EMPTY_MAX_INTERVAL = 900 # Cap while there are no dispatches at all (eg car not plugged in)
+FAST_PERIOD = 600 # How long to keep polling fast after a change
+APPROACH_PERIOD = 900 # Poll fast when a boundary is this close
+BOUNDARY_MARGIN = 5 # Wake this long after a boundary so it has definitely passed
+
+# Times of day the schedule always changes - start & end of the standard off-peak period, and the new day
+DAILY_BOUNDARIES = ((23, 30), (5, 30), (0, 0))
+
+_sites = {}
+_lock = threading.Lock()
+
+
+def _aware(dt):
+    # check_free_electricity returns naive times, which are UK local
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=ZoneInfo("Europe/London"))
+    return dt
+
+
+def recordRun(siteId, dispatches, boundaries):
+    """Record the result of a run - the raw planned dispatches and any times the schedule is known to change
+    (dispatch, free electricity and savings session starts & ends)."""
+    fingerprint = hashlib.sha256(json.dumps(dispatches, sort_keys=True).encode()).hexdigest()
+    with _lock:
+        site = _sites.get(siteId)
+        if site is None or site["fingerprint"] != fingerprint:
+            site = {"fingerprint": fingerprint, "changedAt": time.time(), "unchangedRuns": 0}
+        elif time.time() - site["changedAt"] >= FAST_PERIOD:
+            # Only start backing off once the fast period is over
+            site["unchangedRuns"] += 1
+        site["empty"] = len(dispatches) == 0
+        site["boundaries"] = [_aware(boundary) for boundary in boundaries if boundary]
+        _sites[siteId] = site
+
+
+def nextBoundary(site, now):
+    today = now.replace(second=0, microsecond=0)
+    candidates = [today.replace(hour=hour, minute=minute) for hour, minute in DAILY_BOUNDARIES]
+    candidates += [candidate + timedelta(days=1) for candidate in candidates]
+    candidates += site["boundaries"]
+    return min(candidate for candidate in candidates if candidate > now)
+
+
+def nextDelay(siteId):
+    """Seconds to wait before the site's next run."""
+    site = _sites.get(siteId)
+    if site is None:
+        return FAST_INTERVAL
+    now = datetime.now(ZoneInfo("Europe/London"))
+    if time.time() - site["changedAt"] < FAST_PERIOD:
+        delay = FAST_INTERVAL
+    else:
+        cap = EMPTY_MAX_INTERVAL if site["empty"] else STABLE_MAX_INTERVAL
+        delay = min(cap, STABLE_INTERVAL * 2 ** min(max(site["unchangedRuns"] - 1, 0), 8))
+
+    # Never sleep through a boundary, and poll fast on the approach to one
+    untilBoundary = (nextBoundary(site, now) - now).total_seconds()
+    if untilBoundary < APPROACH_PERIOD:
+        delay = min(delay, FAST_INTERVAL)
+    return min(delay, untilBoundary + BOUNDARY_MARGIN)
@@ -0,0 +1,74 @@
+import mmap
+import os
+import struct
+
+# Two append-only files per site, each starting with an 8 byte magic string:
+#  - dispatch snapshots: a header of (run time, dispatch count) followed by a (start, end) pair per dispatch.
+#    All times are epoch seconds as little-endian int64
+#  - pushed slot grids: fixed 56 byte records of (run time, 48 slot types - one byte per half hour)
+DISPATCH_FILE = "IO-Dispatch-Archive-{site}.bin"
+GRID_FILE = "IO-Grid-Archive-{site}.bin"
+DISPATCH_MAGIC = b"IODISP01"
+GRID_MAGIC = b"IOGRID01"
+
+SNAPSHOT_HEADER = struct.Struct("<qI")
+DISPATCH = struct.Struct("<qq")
+GRID = struct.Struct("<q48s")
+
+
+def _append(path, magic, record):
+    with open(path, "ab") as f:
+        if f.tell() == 0:
+            f.write(magic)
+        # A single write per record, so a reader never sees half a record from an interrupted run
+        f.write(record)
+
+
+def appendSnapshot(siteId, runAt, dispatches):
+    """Archive a set of planned dispatches. runAt and each dispatch's (start, end) are datetimes."""
+    record = SNAPSHOT_HEADER.pack(int(runAt.timestamp()), len(dispatches))
+    record += b"".join(DISPATCH.pack(int(start.timestamp()), int(end.timestamp())) for start, end in dispatches)
+    _append(DISPATCH_FILE.format(site=siteId), DISPATCH_MAGIC, record)
+
+
+def appendGrid(siteId, runAt, grid):
+    """Archive a pushed slot grid - 48 small ints (the SLOT_ constants)."""
+    _append(GRID_FILE.format(site=siteId), GRID_MAGIC, GRID.pack(int(runAt.timestamp()), bytes(grid)))
+
+
+def _open(path, magic):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(magic):
+            return None
+        archive = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if archive[:len(magic)] != magic:
+        archive.close()
+        raise ValueError(f"{path} is not a dispatch archive")
+    return archive
+
+
+def readSnapshots(path):
+    """Yield (run time, [(start, end), ...]) in epoch seconds for each snapshot. The file is memory mapped, so only
+    the pages being read are loaded - suitable for scanning years of history."""
+    archive = _open(path, DISPATCH_MAGIC)
+    if archive is None:
+        return
+    with archive:
+        offset = len(DISPATCH_MAGIC)
+        while offset + SNAPSHOT_HEADER.size <= len(archive):
+            runAt, count = SNAPSHOT_HEADER.unpack_from(archive, offset)
+            offset += SNAPSHOT_HEADER.size
+            if offset + count * DISPATCH.size > len(archive):
+                break
+            yield runAt, [DISPATCH.unpack_from(archive, offset + i * DISPATCH.size) for i in range(count)]
+            offset += count * DISPATCH.size
+
+
+def readGrids(path):
+    """Yield (run time, grid) for each pushed grid, where grid is a bytes object of 48 slot types."""
+    archive = _open(path, GRID_MAGIC)
+    if archive is None:
+        return
+    with archive:
+        for offset in range(len(GRID_MAGIC), len(archive) - GRID.size + 1, GRID.size):
+            yield GRID.unpack_from(archive, offset)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import fn_http
+import fn_post_compile
+import fn_resilience
+
+# Post-compile stage controlling whether the Powerwall may export from its battery (Powerwall-Limit-Export).
+# Battery export is only allowed in the REENABLE_EXPORT_OFFSET hours before the standard off-peak period starts (23:30)
+# - so the battery is emptied for money just before it can be refilled cheaply - and during savings sessions. Short
+# daytime dispatches don't count, as they are too short to refill the battery. The rest of the time only excess solar
+# is exported.
+EXPORT_URL = "https://api.tessie.com/api/1/energy_sites/{site}/grid_import_export"
+EXPORT_BATTERY = "battery_ok"
+EXPORT_SOLAR_ONLY = "pv_only"
+
+# With SAVINGS_SESSIONS on, the battery is held back over the usual savings session hours
+SAVINGS_HOLD_START = 16
+SAVINGS_HOLD_END = 19
+
+
+def decideExportMode(grid, now, offPeakStart, offsetHours, savingsSessions, slotTypes):
+    index = now.hour * 2 + now.minute // 30
+    slot = grid[index]
+    cheap = (slotTypes["OFFPEAK"], slotTypes["FREE"])
+    if slot == slotTypes["SAVINGS"]:
+        return EXPORT_BATTERY
+    if slot in cheap:
+        return EXPORT_SOLAR_ONLY
+    if savingsSessions and SAVINGS_HOLD_START <= now.hour < SAVINGS_HOLD_END:
+        return EXPORT_SOLAR_ONLY
+    # Hours from now until the standard off-peak period next starts
+    nextOffPeak = now.replace(hour=offPeakStart.hour, minute=offPeakStart.minute, second=0, microsecond=0)
+    if nextOffPeak <= now:
+        nextOffPeak += timedelta(days=1)
+    hoursUntilOffPeak = (nextOffPeak - now).total_seconds() / 3600
+    return EXPORT_BATTERY if hoursUntilOffPeak <= offsetHours else EXPORT_SOLAR_ONLY
+
+
+def exportLimitStage(context):
+    config = context["config"]
+    state = context["state"]
+    debug = config["DEBUG_PW_LIMIT"] or context["debug"]
+    mode = decideExportMode(context["grid"], context["now"], context["offPeakStart"], config["REENABLE_EXPORT_OFFSET"], config["SAVINGS_SESSIONS"], context["slotTypes"])
+    if debug:
+        print("Export Limit: mode for now is "+mode+", last set to "+str(state.get("exportMode")))
+    # Only call Tessie when the mode changes
+    if mode == state.get("exportMode"):
+        return "unchanged: "+mode
+    if config["READONLY_PW_LIMIT"] or context["readonly"]:
+        return "readonly: would set "+mode
+
+    url = EXPORT_URL.format(site=context["siteId"])
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer "+context["tessieApiKey"]}
+    r = fn_resilience.call(state, "tessie-export", lambda: fn_resilience.checkResponse(
+        fn_http.getSession().post(url, json={"customer_preferred_export_rule": mode}, headers=headers, timeout=context["timeout"])))
+    if r.status_code != 200:
+        context["logMsg"]("ERROR","Failed to set Powerwall export mode. Code: "+str(r.status_code)+" - Message: "+r.reason)
+        return "failed: "+str(r.status_code)+" "+r.reason
+    state["exportMode"] = mode
+    context["logMsg"]("INFO","Set Powerwall export mode to "+mode)
+    return "updated: "+mode
+
+
+fn_post_compile.registerStage("export-limit", exportLimitStage, "EXPORT_LIMIT_ENABLE")
@@ -0,0 +1,50 @@
+import threading
+import time
+
+# Results younger than this (seconds) are handed to any other run asking for the same key
+MAX_AGE = 30
+
+# key -> {"event": threading.Event while a fetch is in flight, "result", "fetchedAt", "error"}
+_entries = {}
+_lock = threading.Lock()
+
+
+def fetch(key, fetchFn, maxAge=MAX_AGE):
+    """Return fetchFn() for key, sharing the result between runs.
+
+    Used to fetch once per Octopus account rather than once per Powerwall site. If a fetch for the key is already
+    in flight the caller waits for it (single-flight) rather than starting another, and a result fetched within the
+    last maxAge seconds is reused. Errors are passed to every waiting caller but never cached.
+    """
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry["event"] is None and time.monotonic() - entry["fetchedAt"] < maxAge:
+            return entry["result"]
+        leader = not (entry and entry["event"] is not None)
+        if leader:
+            entry = {"event": threading.Event()}
+            _entries[key] = entry
+        event = entry["event"]
+
+    if not leader:
+        event.wait()
+        if "error" in entry:
+            raise entry["error"]
+        return entry["result"]
+
+    try:
+        result = fetchFn()
+    except Exception as err:
+        with _lock:
+            entry["error"] = err
+            entry["event"] = None
+            if _entries.get(key) is entry:
+                del _entries[key]
+        event.set()
+        raise
+    with _lock:
+        entry["result"] = result
+        entry["fetchedAt"] = time.monotonic()
+        entry["event"] = None
+    event.set()
+    return result
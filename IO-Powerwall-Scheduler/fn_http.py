@@ -0,0 +1,23 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept open per host - enough for a fleet's worth of concurrent calls
+POOL_SIZE = 20
+
+_session = None
+_lock = threading.Lock()
+
+
+def getSession():
+    """Return the process-wide requests session, so calls to Tessie and Octopus reuse pooled connections."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
@@ -0,0 +1,98 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+
+# Size based rotation by default. Set ROTATE_WHEN (eg "midnight") to rotate on time instead
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+ROTATE_WHEN = None
+
+# Records are held in memory and written in batches. Anything at ERROR or above is written straight away
+BUFFER_CAPACITY = 50
+
+_loggers = {}
+_buffers = []
+_listeners = []
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).astimezone().isoformat(),
+            "severity": record.levelname,
+            "site_id": getattr(record, "site_id", None),
+            "run_id": getattr(record, "run_id", None),
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry)
+
+
+def gzipNamer(name):
+    return name + ".gz"
+
+
+def gzipRotator(source, dest):
+    with open(source, "rb") as fIn, gzip.open(dest, "wb") as fOut:
+        shutil.copyfileobj(fIn, fOut)
+    os.remove(source)
+
+
+def getLogger(logFile, background=False):
+    """Return the logger writing JSON lines to logFile. One logger (and one set of handlers) is shared per file.
+
+    With background=True records are handed to a queue and written by a listener thread, so the caller never
+    waits on the disk - used by the daemon and fleet modes.
+    """
+    key = os.path.abspath(logFile)
+    with _lock:
+        if key in _loggers:
+            return _loggers[key]
+        if ROTATE_WHEN:
+            fileHandler = logging.handlers.TimedRotatingFileHandler(logFile, when=ROTATE_WHEN, backupCount=BACKUP_COUNT)
+        else:
+            fileHandler = logging.handlers.RotatingFileHandler(logFile, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT)
+        fileHandler.namer = gzipNamer
+        fileHandler.rotator = gzipRotator
+        fileHandler.setFormatter(JsonFormatter())
+        buffer = logging.handlers.MemoryHandler(BUFFER_CAPACITY, flushLevel=logging.ERROR, target=fileHandler)
+        _buffers.append(buffer)
+
+        # Not registered with logging.getLogger - these must never propagate to the root logger
+        logger = logging.Logger("IO-Scheduler", logging.DEBUG)
+        if background:
+            records = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(records, buffer)
+            listener.start()
+            _listeners.append(listener)
+            logger.addHandler(logging.handlers.QueueHandler(records))
+        else:
+            logger.addHandler(buffer)
+        _loggers[key] = logger
+        return logger
+
+
+def getRunLogger(logFile, siteId, runId, background=False):
+    return logging.LoggerAdapter(getLogger(logFile, background), {"site_id": siteId, "run_id": runId})
+
+
+def flush():
+    for buffer in _buffers:
+        buffer.flush()
+
+
+def _shutdown():
+    # Drain the queues before logging's own shutdown flushes and closes the buffers
+    for listener in _listeners:
+        listener.stop()
+    flush()
+
+
+atexit.register(_shutdown)
@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import fn_http
+
+# Post-compile stages are extra actions run after the slot grid has been compiled, eg changing the Powerwall export
+# mode. A stage is a function taking the run's context dict (see the scheduler for the keys) and returning a short
+# result string. Plugins call registerStage when imported, naming the config key that turns them on.
+_stages = []
+
+# Shared by every site, sized to match the HTTP connection pool the stages and tariff push use
+_executor = None
+_lock = threading.Lock()
+
+
+def registerStage(name, stage, enableKey):
+    _stages.append((name, stage, enableKey))
+
+
+def enabledStages(config):
+    return [(name, stage) for name, stage, enableKey in _stages if config.get(enableKey)]
+
+
+def _getExecutor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=fn_http.POOL_SIZE, thread_name_prefix="post-compile")
+    return _executor
+
+
+def run(context, stages, push=None):
+    """Run the tariff push (if given) and every stage at the same time, and return each one's result by name.
+    A failing stage is logged and reported in the results - it never stops the push or the other stages."""
+    executor = _getExecutor()
+    futures = {}
+    if push:
+        futures["push"] = executor.submit(push)
+    for name, stage in stages:
+        futures[name] = executor.submit(stage, context)
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as err:
+            results[name] = "error: " + str(err)
+            context["logMsg"]("ERROR", "Post-compile stage " + name + " failed: " + str(err))
+    return results
@@ -0,0 +1,91 @@
+import json
+import os
+import random
+import time
+import urllib.error
+
+import requests
+
+# Retry settings for transient errors (connection failures, timeouts, HTTP 429 and 5xx).
+# Each retry waits a random time between 0 and BASE_DELAY*2^attempt seconds, capped at MAX_DELAY
+RETRIES = 3
+BASE_DELAY = 1
+MAX_DELAY = 10
+
+# A circuit breaker opens for an endpoint after BREAKER_THRESHOLD consecutive failed calls. While open, calls are
+# skipped without touching the network. After BREAKER_COOLDOWN seconds a single trial call is let through (half-open)
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 300
+
+
+class TransientError(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def loadState(stateFile):
+    try:
+        with open(stateFile, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def saveState(stateFile, state):
+    # Write to a temporary file first so a crash mid-write never leaves a corrupt state file behind
+    tmpFile = stateFile + ".tmp"
+    with open(tmpFile, "w") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmpFile, stateFile)
+
+
+def checkResponse(r):
+    if r.status_code == 429 or r.status_code >= 500:
+        raise TransientError(f"HTTP {r.status_code} {r.reason}")
+    return r
+
+
+def isTransient(err):
+    if isinstance(err, (TransientError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(err, urllib.error.HTTPError):
+        return err.code == 429 or err.code >= 500
+    return isinstance(err, (urllib.error.URLError, TimeoutError))
+
+
+def breakerStatus(state, endpoint):
+    breaker = state.get("breakers", {}).get(endpoint)
+    if not breaker or breaker["failures"] < BREAKER_THRESHOLD:
+        return "closed"
+    if time.time() - breaker["openedAt"] < BREAKER_COOLDOWN:
+        return "open"
+    return "half-open"
+
+
+def call(state, endpoint, fn):
+    """Run fn() for the named endpoint, retrying transient errors and tracking failures in state["breakers"]."""
+    breaker = state.setdefault("breakers", {}).setdefault(endpoint, {"failures": 0, "openedAt": 0})
+    status = breakerStatus(state, endpoint)
+    if status == "open":
+        raise CircuitOpenError(f"Circuit open for {endpoint} - skipping call")
+    # Only one attempt while half-open - if the endpoint is still down we go straight back to open
+    retries = 0 if status == "half-open" else RETRIES
+    attempt = 0
+    while True:
+        try:
+            result = fn()
+        except Exception as err:
+            if isTransient(err) and attempt < retries:
+                time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+                attempt += 1
+                continue
+            breaker["failures"] += 1
+            if breaker["failures"] >= BREAKER_THRESHOLD:
+                breaker["openedAt"] = time.time()
+            raise
+        breaker["failures"] = 0
+        breaker["openedAt"] = 0
+        return result
@@ -1,6 +1,9 @@
 import requests,json
 import datetime
 from datetime import datetime, timezone
+
+import fn_http
+import fn_resilience
 def saving_sessions(octopusURL,authToken,accountNumber):
         global DEBUG
         returnData=""
@@ -27,7 +30,7 @@ def saving_sessions(octopusURL,authToken,accountNumber):
         """
         variables = {'account': str(accountNumber)}
         headers = {"Authorization": authToken}
-        r = requests.post(octopusURL,json={'query': query, 'variables': variables},headers=headers)
+        r = fn_resilience.checkResponse(fn_http.getSession().post(octopusURL,json={'query': query, 'variables': variables},headers=headers,timeout=30))
 #        print(r.text)
         for event in json.loads(r.text)["data"]["savingSessions"]["events"]:
            eventStart=datetime.strptime(event["startAt"],"%Y-%m-%dT%H:%M:%S%z")
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+# Sections published by each scheduler run. /sites/<site id> returns them all, /sites/<site id>/<section> just one
+SECTIONS = ("slots", "dispatches", "windows", "push", "telemetry")
+
+# Slot types that count as cheap when answering /sites/<site id>/now
+CHEAP_SLOTS = ("Off Peak", "Free Session")
+
+# Pre-serialised responses keyed on path, each held as (body, etag). Rebuilt on publish so a GET is a dict lookup
+_responses = {}
+_sites = {}
+_lock = threading.Lock()
+_server = None
+
+
+def _response(data):
+    body = json.dumps(data, default=str).encode()
+    return body, '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+def publish(siteId, **sections):
+    """Store the latest results for a site - eg publish(siteId, slots=..., push=...). No upstream calls are made."""
+    global _responses
+    with _lock:
+        site = dict(_sites.get(siteId, {}))
+        site.update(sections)
+        site["updatedAt"] = datetime.now().astimezone().isoformat()
+        _sites[siteId] = site
+        responses = dict(_responses)
+        responses["/sites"] = _response(sorted(_sites))
+        responses["/sites/" + siteId] = _response(site)
+        for section in SECTIONS:
+            if section in site:
+                responses["/sites/" + siteId + "/" + section] = _response(site[section])
+        # Swap in the new set in one go so readers never see a half-built set of responses
+        _responses = responses
+
+
+def currentSlot(siteId):
+    """Work out whether the site is in a cheap slot right now, and when the next cheap window starts and ends."""
+    slots = _sites.get(siteId, {}).get("slots")
+    if not slots:
+        return None
+    grid = slots["grid"]
+    now = datetime.now(ZoneInfo("Europe/London"))
+    index = now.hour * 2 + now.minute // 30
+
+    def slotTime(i):
+        return "%02d:%02d" % ((i // 2) % 24, (i % 2) * 30)
+
+    nextWindow = None
+    # Look across today and round into tomorrow - the grid repeats daily
+    for i in range(index, index + len(grid)):
+        if grid[i % len(grid)] in CHEAP_SLOTS:
+            end = i
+            while end < index + len(grid) and grid[end % len(grid)] in CHEAP_SLOTS:
+                end += 1
+            nextWindow = {"type": grid[i % len(grid)], "start": slotTime(i), "end": slotTime(end)}
+            break
+    # The start of the current slot rather than the time now, so the ETag only changes when the answer does. The
+    # time of the request is in the Date header
+    return {
+        "slotStart": now.replace(minute=now.minute // 30 * 30, second=0, microsecond=0).isoformat(),
+        "slot": grid[index],
+        "cheap": grid[index] in CHEAP_SLOTS,
+        "nextCheapWindow": nextWindow,
+    }
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        cached = _responses.get(path)
+        if cached is None and path.startswith("/sites/") and path.endswith("/now"):
+            data = currentSlot(path[len("/sites/"):-len("/now")])
+            cached = _response(data) if data else None
+        if cached is None:
+            self.send_error(404)
+            return
+        body, etag = cached
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port, host="127.0.0.1"):
+    """Serve the published results on a background thread. Only useful in daemon mode - a cron run exits straight away."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), StatusHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
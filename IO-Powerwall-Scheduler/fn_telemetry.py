@@ -0,0 +1,26 @@
+from datetime import datetime
+
+import fn_fetch_cache
+import fn_http
+import fn_resilience
+
+# Live Powerwall status - state of charge plus battery, grid, solar and load power (W) - via Tessie
+LIVE_STATUS_URL = "https://api.tessie.com/api/1/energy_sites/{site}/live_status"
+
+# One poll per site per TTL seconds, shared by everything that asks (the compiler, post-compile stages, status API)
+TTL = 60
+
+FIELDS = ("percentage_charged", "battery_power", "grid_power", "solar_power", "load_power")
+
+
+def getLiveStatus(siteId, tessieApiKey, state, timeout=30):
+    def poll():
+        headers = {"Authorization": "Bearer "+tessieApiKey}
+        r = fn_resilience.call(state, "tessie-live-status", lambda: fn_resilience.checkResponse(
+            fn_http.getSession().get(LIVE_STATUS_URL.format(site=siteId), headers=headers, timeout=timeout)))
+        r.raise_for_status()
+        response = r.json()["response"]
+        telemetry = {field: response.get(field) for field in FIELDS}
+        telemetry["fetchedAt"] = datetime.now().astimezone().isoformat()
+        return telemetry
+    return fn_fetch_cache.fetch("telemetry-"+str(siteId), poll, maxAge=TTL)